@@ -32,6 +32,7 @@ from pikaraoke.routes.background_music import background_music_bp
 from pikaraoke.routes.batch_song_renamer import batch_song_renamer_bp
 from pikaraoke.routes.controller import controller_bp
 from pikaraoke.routes.files import files_bp
+from pikaraoke.routes.history import history_bp
 from pikaraoke.routes.home import home_bp
 from pikaraoke.routes.images import images_bp
 from pikaraoke.routes.info import info_bp
@@ -83,6 +84,7 @@ app.register_blueprint(batch_song_renamer_bp)
 app.register_blueprint(queue_bp)
 app.register_blueprint(images_bp)
 app.register_blueprint(files_bp)
+app.register_blueprint(history_bp)
 app.register_blueprint(search_bp)
 app.register_blueprint(info_bp)
 app.register_blueprint(splash_bp)
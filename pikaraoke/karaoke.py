@@ -8,6 +8,7 @@ import logging
 import os
 import shutil
 import socket
+import sqlite3
 import subprocess
 import time
 from subprocess import check_output
@@ -31,6 +32,7 @@ from pikaraoke.lib.get_platform import (
     is_raspberry_pi,
 )
 from pikaraoke.lib.network import get_ip
+from pikaraoke.lib.play_database import PlayDatabase
 from pikaraoke.lib.queue_manager import QueueManager
 from pikaraoke.lib.song_list import SongList
 from pikaraoke.lib.stream_manager import StreamManager
@@ -317,6 +319,9 @@ class Karaoke:
             self.change_preferences("preferred_language", preferred_language)
             logging.info(f"Setting preferred language to: {preferred_language}")
 
+        # Initialize play history database
+        self.play_db = PlayDatabase(os.path.join(get_data_directory(), "play_history.db"))
+
         # Initialize and start download manager
         self.download_manager = DownloadManager(self)
         self.download_manager.start()
@@ -666,6 +671,16 @@ class Karaoke:
             if reason != "complete":
                 # MSG: Message shown when the song ends abnormally
                 self.send_notification(_("Song ended abnormally: %s") % reason, "danger")
+        if self.now_playing is not None:
+            try:
+                self.play_db.add_play(
+                    self.now_playing_user or "Pikaraoke",
+                    self.now_playing,
+                    duration=self.now_playing_duration,
+                    completed=reason is None or reason == "complete",
+                )
+            except sqlite3.Error as e:
+                logging.error(f"Failed to record play history: {e}")
         self.reset_now_playing()
         self.kill_ffmpeg()
         # Small delay to ensure FFmpeg fully terminates and file handles close
@@ -0,0 +1,768 @@
+"""SQLite-backed play history for PiKaraoke.
+
+Records every song played (who sang it, when, and whether it finished) and
+answers the aggregate queries behind the /history page: top songs, top
+users, and recent plays with user/date filtering.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+
+# SQL for the hot-path statements, hoisted so every call reuses the exact
+# same string and hits sqlite3's per-connection prepared-statement cache
+_SQL_INSERT_PLAY = (
+    "INSERT INTO plays(timestamp, canonical_name, song, duration, completed) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+_SQL_BUMP_PLAYS_TOTAL = "UPDATE counters SET val = val + 1 WHERE name = 'plays_total'"
+_SQL_BUMP_SONG_COUNT = (
+    "INSERT INTO song_counts(song, cnt) VALUES (?, ?) "
+    "ON CONFLICT(song) DO UPDATE SET cnt = cnt + excluded.cnt"
+)
+_SQL_BUMP_USER_COUNT = (
+    "INSERT INTO user_counts(canonical_name, cnt) VALUES (?, ?) "
+    "ON CONFLICT(canonical_name) DO UPDATE SET cnt = cnt + excluded.cnt"
+)
+_SQL_BUMP_PERIOD_COUNT = (
+    "INSERT INTO period_song_counts(period, bucket, song, cnt) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(period, bucket, song) DO UPDATE SET cnt = cnt + excluded.cnt"
+)
+_SQL_TOP_SONGS = "SELECT song, cnt FROM song_counts WHERE cnt > 0 ORDER BY cnt DESC LIMIT ?"
+_SQL_TOP_USERS = (
+    "SELECT canonical_name, cnt FROM user_counts WHERE cnt > 0 ORDER BY cnt DESC LIMIT ?"
+)
+_SQL_TOP_USERS_COUNT = "SELECT COUNT(*) FROM user_counts WHERE cnt > 0"
+_SQL_TOP_SONGS_BY_PERIOD = (
+    "SELECT song, cnt FROM period_song_counts "
+    "WHERE period = ? AND bucket = ? AND cnt > 0 ORDER BY cnt DESC LIMIT ?"
+)
+_SQL_PLAYS_TOTAL = "SELECT val FROM counters WHERE name = 'plays_total'"
+_SQL_LAST_PLAYS = (
+    "SELECT p.id, p.timestamp, p.canonical_name, p.song, p.completed "
+    "FROM plays p {where} ORDER BY p.timestamp DESC, p.id DESC LIMIT ? OFFSET ?"
+)
+
+# One WHERE fragment per (user?, date?) filter combination, so callers
+# always execute one of a small fixed set of statements
+_SQL_FILTERS = {
+    (False, False): "",
+    (True, False): "WHERE p.canonical_name = ?",
+    (False, True): "WHERE p.play_date = ?",
+    (True, True): "WHERE p.canonical_name = ? AND p.play_date = ?",
+}
+
+
+class PlayDatabase:
+    """Persistent play history store backed by SQLite.
+
+    A single connection per thread is created lazily and reused for the
+    lifetime of the process, so request handlers don't pay connection
+    setup cost on every query. Usernames are resolved through the
+    ``user_aliases`` table so renamed singers keep one history.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """Initialize the database, creating tables if needed.
+
+        Args:
+            db_path: Path to the SQLite database file.
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+        self._alias_cache: dict[str, str] = {}
+        self._distinct_cache: dict[str, tuple[int, list[str]]] = {}
+        self._plays_version = 0
+        self.init_db()
+        self._load_alias_cache()
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get the long-lived connection for the current thread.
+
+        The connection is created on first use per thread and reused for
+        all subsequent queries. Autocommit mode (``isolation_level=None``)
+        is used so writes control their own BEGIN/COMMIT explicitly.
+
+        Returns:
+            The thread-local SQLite connection.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._apply_pragmas(conn)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Open an explicit write transaction on the thread's connection.
+
+        Commits on success and rolls back on any exception, so a failed
+        write can't leave the persistent connection stuck inside an open
+        transaction (which would break every later write on that thread).
+
+        Yields:
+            The thread-local connection with a transaction open.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _apply_pragmas(conn: sqlite3.Connection) -> None:
+        """Tune a fresh connection for concurrent read/write performance.
+
+        WAL journaling lets /history readers proceed while a play is being
+        recorded; the remaining pragmas trade a little durability and memory
+        for lower query latency, which is the right call for a play log.
+
+        Args:
+            conn: The connection to configure.
+        """
+        conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-20000;
+            PRAGMA mmap_size=268435456;
+            PRAGMA busy_timeout=5000;
+            """
+        )
+
+    def init_db(self) -> None:
+        """Create the schema if it does not exist yet."""
+        self._create_tables_if_needed()
+
+    def _create_tables_if_needed(self) -> None:
+        """Create tables and indexes for plays, users, and aliases."""
+        conn = self._conn()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS plays (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL DEFAULT (datetime('now', 'localtime')),
+                canonical_name TEXT NOT NULL,
+                song TEXT NOT NULL,
+                duration INTEGER,
+                completed INTEGER NOT NULL DEFAULT 1,
+                play_date TEXT GENERATED ALWAYS AS (substr(timestamp, 1, 10)) VIRTUAL
+            );
+            CREATE TABLE IF NOT EXISTS users (
+                canonical_name TEXT PRIMARY KEY
+            );
+            CREATE TABLE IF NOT EXISTS user_aliases (
+                alias TEXT PRIMARY KEY,
+                canonical_name TEXT NOT NULL,
+                alias_norm TEXT GENERATED ALWAYS AS (lower(trim(alias))) VIRTUAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_plays_timestamp ON plays(timestamp);
+            DROP INDEX IF EXISTS idx_plays_canonical_name;
+            CREATE INDEX IF NOT EXISTS idx_plays_user_ts
+                ON plays(canonical_name, timestamp DESC);
+            CREATE INDEX IF NOT EXISTS idx_plays_ts_desc
+                ON plays(timestamp DESC, canonical_name, song, completed);
+            CREATE TABLE IF NOT EXISTS song_counts (
+                song TEXT PRIMARY KEY,
+                cnt INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS user_counts (
+                canonical_name TEXT PRIMARY KEY,
+                cnt INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS period_song_counts (
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                song TEXT NOT NULL,
+                cnt INTEGER NOT NULL,
+                PRIMARY KEY (period, bucket, song)
+            );
+            CREATE INDEX IF NOT EXISTS idx_song_counts_cnt ON song_counts(cnt DESC);
+            CREATE INDEX IF NOT EXISTS idx_user_counts_cnt ON user_counts(cnt DESC);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                val INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO counters(name, val)
+                SELECT 'plays_total', COUNT(*) FROM plays;
+            CREATE UNIQUE INDEX IF NOT EXISTS uq_plays_dedup
+                ON plays(timestamp, canonical_name, song);
+            CREATE INDEX IF NOT EXISTS idx_plays_completed_song
+                ON plays(song) WHERE completed = 1;
+            CREATE INDEX IF NOT EXISTS idx_plays_completed_user
+                ON plays(canonical_name) WHERE completed = 1;
+            CREATE INDEX IF NOT EXISTS idx_plays_completed_ts
+                ON plays(timestamp) WHERE completed = 1;
+            """
+        )
+        # table_xinfo, not table_info: the latter hides generated columns
+        columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(user_aliases)")]
+        if "alias_norm" not in columns:
+            conn.execute(
+                "ALTER TABLE user_aliases ADD COLUMN alias_norm TEXT "
+                "GENERATED ALWAYS AS (lower(trim(alias))) VIRTUAL"
+            )
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_alias_norm ON user_aliases(alias_norm)")
+        columns = [row[1] for row in conn.execute("PRAGMA table_xinfo(plays)")]
+        if "play_date" not in columns:
+            conn.execute(
+                "ALTER TABLE plays ADD COLUMN play_date TEXT "
+                "GENERATED ALWAYS AS (substr(timestamp, 1, 10)) VIRTUAL"
+            )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_plays_play_date ON plays(play_date)")
+        self._rebuild_summaries_if_needed()
+
+    # Slice widths of an ISO timestamp for the day/month/year summary buckets
+    _PERIOD_SLICES = {"day": 10, "month": 7, "year": 4}
+
+    def _rebuild_summaries_if_needed(self) -> None:
+        """Backfill the summary tables from plays if they are empty.
+
+        Handles databases created before the summary tables existed. On a
+        fresh or already-summarized database this is a no-op.
+        """
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM song_counts LIMIT 1").fetchone() is not None:
+            return
+        if conn.execute("SELECT 1 FROM plays LIMIT 1").fetchone() is None:
+            return
+        logging.info("Rebuilding play history summary tables")
+        with self._transaction() as conn:
+            self._rebuild_summaries(conn)
+
+    def _rebuild_summaries(self, conn: sqlite3.Connection) -> None:
+        """Recompute all summary tables from plays in one pass each.
+
+        Runs on the caller's connection inside its open transaction.
+
+        Args:
+            conn: Connection with an open transaction.
+        """
+        conn.execute("DELETE FROM song_counts")
+        conn.execute("DELETE FROM user_counts")
+        conn.execute("DELETE FROM period_song_counts")
+        conn.execute(
+            "INSERT INTO song_counts(song, cnt) "
+            "SELECT song, COUNT(*) FROM plays WHERE completed = 1 GROUP BY song"
+        )
+        conn.execute(
+            "INSERT INTO user_counts(canonical_name, cnt) "
+            "SELECT canonical_name, COUNT(*) FROM plays WHERE completed = 1 "
+            "GROUP BY canonical_name"
+        )
+        for period, width in self._PERIOD_SLICES.items():
+            conn.execute(
+                f"INSERT INTO period_song_counts(period, bucket, song, cnt) "
+                f"SELECT ?, substr(timestamp, 1, {width}), song, COUNT(*) FROM plays "
+                f"WHERE completed = 1 GROUP BY substr(timestamp, 1, {width}), song",
+                (period,),
+            )
+
+    def _bump_summaries(
+        self, conn: sqlite3.Connection, canonical: str, song: str, timestamp: str, delta: int
+    ) -> None:
+        """Adjust the summary tables for one completed play.
+
+        Runs on the caller's connection so it joins whatever transaction
+        the accompanying plays write is in.
+
+        Args:
+            conn: Connection with an open transaction.
+            canonical: Canonical username of the play.
+            song: Song title of the play.
+            timestamp: ISO timestamp of the play.
+            delta: +1 when adding a play, -1 when removing one.
+        """
+        conn.execute(_SQL_BUMP_SONG_COUNT, (song, delta))
+        conn.execute(_SQL_BUMP_USER_COUNT, (canonical, delta))
+        for period, width in self._PERIOD_SLICES.items():
+            conn.execute(_SQL_BUMP_PERIOD_COUNT, (period, timestamp[:width], song, delta))
+
+    @staticmethod
+    def _normalize_user(user: str) -> str:
+        """Normalize a user-entered name for alias matching.
+
+        Args:
+            user: Username as entered.
+
+        Returns:
+            Lowercased, whitespace-trimmed key.
+        """
+        return user.strip().lower()
+
+    def _load_alias_cache(self) -> None:
+        """Load known users and aliases into the in-process cache, keyed normalized.
+
+        Seeding from the users table keeps case/whitespace variants of
+        previously seen names resolving to one canonical name across
+        restarts; explicit aliases take precedence.
+        """
+        conn = self._conn()
+        cache = {
+            self._normalize_user(name): name
+            for (name,) in conn.execute("SELECT canonical_name FROM users")
+        }
+        cache.update(conn.execute("SELECT alias_norm, canonical_name FROM user_aliases").fetchall())
+        self._alias_cache = cache
+
+    def _resolve_canonical_user(self, user: str) -> str:
+        """Resolve a username to its canonical name via the alias cache.
+
+        Matching ignores case and surrounding whitespace, since names are
+        user-entered and variants like "bob" / "Bob " should share one
+        history. The alias set is small and only changes through
+        set_user_alias / remove_user_alias, so lookups are served from an
+        in-process dict instead of a query per call. Unknown users are
+        registered as their own canonical name and memoized.
+
+        Args:
+            user: Username as entered or recorded.
+
+        Returns:
+            The canonical username.
+        """
+        key = self._normalize_user(user)
+        cached = self._alias_cache.get(key)
+        if cached is not None:
+            return cached
+        user = user.strip()
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO users(canonical_name) VALUES (?)", (user,))
+        self._alias_cache[key] = user
+        return user
+
+    def add_play(
+        self,
+        user: str,
+        song: str,
+        duration: int | None = None,
+        completed: bool = True,
+    ) -> None:
+        """Record a played song.
+
+        Args:
+            user: Username of the singer.
+            song: Display title of the song.
+            duration: Song duration in seconds, if known.
+            completed: False if playback ended abnormally.
+        """
+        canonical = self._resolve_canonical_user(user)
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self._transaction() as conn:
+            conn.execute(
+                _SQL_INSERT_PLAY, (timestamp, canonical, song, duration, 1 if completed else 0)
+            )
+            conn.execute(_SQL_BUMP_PLAYS_TOTAL)
+            if completed:
+                self._bump_summaries(conn, canonical, song, timestamp, 1)
+        self._plays_version += 1
+
+    def update_play(self, play_id: int, user: str | None = None, song: str | None = None) -> None:
+        """Update the user and/or song of an existing play (admin edit).
+
+        Args:
+            play_id: Row id of the play to update.
+            user: New username, if changing.
+            song: New song title, if changing.
+        """
+        canonical = self._resolve_canonical_user(user) if user is not None else None
+        conn = self._conn()
+        old = conn.execute(
+            "SELECT timestamp, canonical_name, song, completed FROM plays WHERE id = ?",
+            (play_id,),
+        ).fetchone()
+        if old is None:
+            return
+        timestamp, old_canonical, old_song, completed = old
+        assignments = []
+        if canonical is not None:
+            assignments.append(("canonical_name", canonical))
+        if song is not None:
+            assignments.append(("song", song))
+        if not assignments:
+            return
+        with self._transaction() as conn:
+            conn.execute(
+                f"UPDATE plays SET {', '.join(f'{col} = ?' for col, _ in assignments)} "
+                f"WHERE id = ?",
+                (*[val for _, val in assignments], play_id),
+            )
+            if completed:
+                self._bump_summaries(conn, old_canonical, old_song, timestamp, -1)
+                self._bump_summaries(
+                    conn, canonical or old_canonical, song or old_song, timestamp, 1
+                )
+        self._plays_version += 1
+
+    def _build_filter_clause(
+        self, user: str | None, date_filter: str | None
+    ) -> tuple[str, list[str]]:
+        """Build a WHERE clause for the optional user and date filters.
+
+        Args:
+            user: Username to filter by, or None.
+            date_filter: Date (YYYY-MM-DD) to filter by, or None.
+
+        Returns:
+            Tuple of (SQL fragment starting with WHERE or empty, parameters).
+        """
+        params: list[str] = []
+        if user is not None:
+            params.append(self._resolve_canonical_user(user))
+        if date_filter is not None:
+            params.append(date_filter)
+        return _SQL_FILTERS[(user is not None, date_filter is not None)], params
+
+    def get_last_plays(
+        self,
+        limit: int = 50,
+        offset: int = 0,
+        user: str | None = None,
+        date_filter: str | None = None,
+        after_ts: str | None = None,
+        after_id: int | None = None,
+    ) -> Iterator[sqlite3.Row]:
+        """Get the most recent plays, newest first.
+
+        Pagination prefers a keyset cursor: pass the timestamp and id of
+        the last row of the previous page as after_ts/after_id and every
+        page is an O(limit) index range read, however deep. The id
+        tiebreaker keeps plays sharing a one-second timestamp (common in
+        imported logs) from being skipped between pages. The OFFSET path
+        remains for deep-linked page numbers but walks and discards
+        skipped rows.
+
+        Args:
+            limit: Maximum number of rows to return.
+            offset: Number of rows to skip (ignored when after_ts is given).
+            user: Only include plays by this user.
+            date_filter: Only include plays on this date (YYYY-MM-DD).
+            after_ts: Only include plays older than this timestamp.
+            after_id: Row id tiebreaker for plays at exactly after_ts.
+
+        Returns:
+            Cursor yielding rows with id, timestamp, canonical_name, song,
+            and completed, streamed as the caller iterates.
+        """
+        where, params = self._build_filter_clause(user, date_filter)
+        if after_ts is not None:
+            if after_id is not None:
+                cursor_clause = "(p.timestamp < ? OR (p.timestamp = ? AND p.id < ?))"
+                params.extend((after_ts, after_ts, after_id))
+            else:
+                cursor_clause = "p.timestamp < ?"
+                params.append(after_ts)
+            where = f"{where} AND {cursor_clause}" if where else f"WHERE {cursor_clause}"
+            offset = 0
+        conn = self._conn()
+        return conn.execute(_SQL_LAST_PLAYS.format(where=where), (*params, limit, offset))
+
+    def get_plays_by_user(
+        self, user: str, limit: int = 50, offset: int = 0
+    ) -> Iterator[sqlite3.Row]:
+        """Get a single user's plays, newest first.
+
+        Args:
+            user: Username (aliases are resolved).
+            limit: Maximum number of rows to return.
+            offset: Number of rows to skip (pagination).
+
+        Returns:
+            Cursor yielding rows with id, timestamp, canonical_name, song,
+            duration, and completed, streamed as the caller iterates.
+        """
+        canonical = self._resolve_canonical_user(user)
+        conn = self._conn()
+        return conn.execute(
+            "SELECT p.id, p.timestamp, p.canonical_name, p.song, p.duration, p.completed "
+            "FROM plays p WHERE p.canonical_name = ? "
+            "ORDER BY p.timestamp DESC LIMIT ? OFFSET ?",
+            (canonical, limit, offset),
+        )
+
+    def get_plays_count(self, user: str | None = None, date_filter: str | None = None) -> int:
+        """Count plays matching the optional filters.
+
+        Args:
+            user: Only count plays by this user.
+            date_filter: Only count plays on this date (YYYY-MM-DD).
+
+        Returns:
+            Number of matching plays.
+        """
+        conn = self._conn()
+        if user is None and date_filter is None:
+            # The unfiltered count is maintained incrementally; COUNT(*)
+            # would walk the whole table
+            return conn.execute(_SQL_PLAYS_TOTAL).fetchone()[0]
+        where, params = self._build_filter_clause(user, date_filter)
+        return conn.execute(f"SELECT COUNT(*) FROM plays p {where}", params).fetchone()[0]
+
+    def get_top_songs(self, limit: int = 10) -> list[sqlite3.Row]:
+        """Get the most-played songs of all time.
+
+        Args:
+            limit: Maximum number of songs to return.
+
+        Returns:
+            List of (song, cnt) rows, most played first.
+        """
+        return self._conn().execute(_SQL_TOP_SONGS, (limit,)).fetchall()
+
+    def get_top_users(self, limit: int = 10) -> list[sqlite3.Row]:
+        """Get the users with the most plays.
+
+        Args:
+            limit: Maximum number of users to return.
+
+        Returns:
+            List of (canonical_name, cnt) rows, most plays first.
+        """
+        return self._conn().execute(_SQL_TOP_USERS, (limit,)).fetchall()
+
+    def get_top_users_count(self) -> int:
+        """Count distinct users with at least one completed play.
+
+        Returns:
+            Number of distinct users.
+        """
+        return self._conn().execute(_SQL_TOP_USERS_COUNT).fetchone()[0]
+
+    def get_top_songs_by_period(self, period: str, limit: int = 5) -> list[sqlite3.Row]:
+        """Get the most-played songs within the current day, month, or year.
+
+        Args:
+            period: One of 'day', 'month', or 'year'.
+            limit: Maximum number of songs to return.
+
+        Returns:
+            List of (song, cnt) rows, most played first.
+
+        Raises:
+            ValueError: If period is not a supported value.
+        """
+        if period not in self._PERIOD_SLICES:
+            raise ValueError(f"Unsupported period: {period}")
+        bucket = datetime.now().strftime("%Y-%m-%d")[: self._PERIOD_SLICES[period]]
+        return self._conn().execute(_SQL_TOP_SONGS_BY_PERIOD, (period, bucket, limit)).fetchall()
+
+    def get_history_page_bundle(
+        self,
+        limit: int,
+        offset: int = 0,
+        user: str | None = None,
+        date_filter: str | None = None,
+        after_ts: str | None = None,
+        after_id: int | None = None,
+        include_songs: bool = False,
+    ) -> dict:
+        """Run all queries behind the /history page in one round-trip.
+
+        Everything executes sequentially on the thread's single connection,
+        so the page pays one Python/SQLite transition batch instead of ten
+        scattered calls.
+
+        Args:
+            limit: Maximum number of recent plays to return.
+            offset: Number of recent plays to skip (pagination).
+            user: Only include plays by this user.
+            date_filter: Only include plays on this date (YYYY-MM-DD).
+            after_ts: Keyset cursor; only plays older than this timestamp.
+            after_id: Row id tiebreaker for plays at exactly after_ts.
+            include_songs: Also fetch the distinct song list (admin edit UI).
+
+        Returns:
+            Dict with plays, has_more, total_count, top songs/users, period
+            trends, and the distinct filter lists.
+        """
+        total_count = self.get_plays_count(user=user, date_filter=date_filter)
+        if after_ts is None:
+            # The count is already known, so has_more falls out of it for
+            # free instead of probing for a limit+1th row
+            plays = list(self.get_last_plays(limit, offset, user=user, date_filter=date_filter))
+            has_more = offset + limit < total_count
+        else:
+            # Keyset paging has no offset to compare against the total, so
+            # probe one row past the page
+            plays = list(
+                self.get_last_plays(
+                    limit + 1,
+                    user=user,
+                    date_filter=date_filter,
+                    after_ts=after_ts,
+                    after_id=after_id,
+                )
+            )
+            has_more = len(plays) > limit
+            plays = plays[:limit]
+        return {
+            "plays": plays,
+            "has_more": has_more,
+            "total_count": total_count,
+            "top_songs": self.get_top_songs(10),
+            "top_users": self.get_top_users(10),
+            "top_users_count": self.get_top_users_count(),
+            "top_songs_day": self.get_top_songs_by_period("day", 5),
+            "top_songs_month": self.get_top_songs_by_period("month", 5),
+            "top_songs_year": self.get_top_songs_by_period("year", 5),
+            "distinct_users": self.get_distinct_users(),
+            "distinct_dates": self.get_distinct_dates(),
+            "distinct_songs": self.get_distinct_songs() if include_songs else [],
+        }
+
+    def _cached_distinct(self, key: str, query: str) -> list[str]:
+        """Get a distinct-value list, cached until the next play write.
+
+        The distinct scans are O(rows) but their results only change when
+        plays change, so they are memoized against _plays_version.
+
+        Args:
+            key: Cache key for this list.
+            query: Single-column SELECT DISTINCT statement.
+
+        Returns:
+            List of distinct values in query order.
+        """
+        version, values = self._distinct_cache.get(key, (-1, []))
+        if version != self._plays_version:
+            values = [row[0] for row in self._conn().execute(query).fetchall()]
+            self._distinct_cache[key] = (self._plays_version, values)
+        return values
+
+    def get_distinct_users(self) -> list[str]:
+        """Get all usernames that appear in the play history.
+
+        Returns:
+            Sorted list of canonical usernames.
+        """
+        return self._cached_distinct(
+            "users", "SELECT DISTINCT canonical_name FROM plays ORDER BY canonical_name"
+        )
+
+    def get_distinct_dates(self) -> list[str]:
+        """Get all dates on which something was played.
+
+        Returns:
+            List of dates (YYYY-MM-DD), newest first.
+        """
+        return self._cached_distinct(
+            "dates", "SELECT DISTINCT play_date FROM plays ORDER BY play_date DESC"
+        )
+
+    def get_distinct_songs(self) -> list[str]:
+        """Get all song titles that appear in the play history.
+
+        Returns:
+            Sorted list of song titles.
+        """
+        return self._cached_distinct("songs", "SELECT DISTINCT song FROM plays ORDER BY song")
+
+    def set_user_alias(self, alias: str, canonical_name: str) -> None:
+        """Map an alias to a canonical username.
+
+        Args:
+            alias: The alternate name to map.
+            canonical_name: The canonical name it should resolve to.
+        """
+        self.set_user_aliases([(alias, canonical_name)])
+
+    def set_user_aliases(self, pairs: list[tuple[str, str]]) -> None:
+        """Map several aliases to canonical usernames in one transaction.
+
+        Args:
+            pairs: (alias, canonical_name) tuples to map.
+        """
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users(canonical_name) VALUES (?)",
+                [(canonical_name,) for _, canonical_name in pairs],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_aliases(alias, canonical_name) VALUES (?, ?)",
+                pairs,
+            )
+        self._alias_cache.update(
+            {self._normalize_user(alias): canonical_name for alias, canonical_name in pairs}
+        )
+
+    def remove_user_alias(self, alias: str) -> None:
+        """Remove an alias mapping.
+
+        Args:
+            alias: The alias to remove.
+        """
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM user_aliases WHERE alias_norm = lower(trim(?))", (alias,))
+        self._alias_cache.pop(self._normalize_user(alias), None)
+
+    def populate_from_log(self, log_path: str) -> int:
+        """Backfill plays from a tab-separated history export.
+
+        Each line must be ``timestamp<TAB>user<TAB>song`` with the timestamp
+        in ``YYYY-MM-DD HH:MM:SS`` format. Lines already present in the
+        database (same timestamp, user, and song) are skipped, so re-importing
+        the same file is safe.
+
+        Args:
+            log_path: Path to the log file.
+
+        Returns:
+            Number of plays imported.
+        """
+        entries = []
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) < 3:
+                    logging.warning(f"Skipping malformed history line: {line.rstrip()}")
+                    continue
+                entries.append((parts[0], parts[1], parts[2]))
+
+        # One transaction for the whole import: a single fsync instead of
+        # one per line, with the unique index handling dedup via OR IGNORE.
+        # Users unknown to the alias cache are registered in one batch
+        # rather than a statement per user.
+        with self._transaction() as conn:
+            unresolved: dict[str, str] = {}
+            for _, user, _ in entries:
+                key = self._normalize_user(user)
+                if key not in self._alias_cache:
+                    # First-seen spelling becomes canonical, like _resolve_canonical_user
+                    unresolved.setdefault(key, user.strip())
+            if unresolved:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO users(canonical_name) VALUES (?)",
+                    [(canonical,) for canonical in unresolved.values()],
+                )
+                self._alias_cache.update(unresolved)
+            rows = [
+                (ts, self._alias_cache[self._normalize_user(user)], song)
+                for ts, user, song in entries
+            ]
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO plays(timestamp, canonical_name, song, completed) "
+                "VALUES (?, ?, ?, 1)",
+                rows,
+            )
+            imported = conn.total_changes - before
+            if imported:
+                conn.execute(
+                    "UPDATE counters SET val = val + ? WHERE name = 'plays_total'", (imported,)
+                )
+                self._rebuild_summaries(conn)
+        if imported:
+            self._plays_version += 1
+        logging.info(f"Imported {imported} plays from {log_path}")
+        return imported
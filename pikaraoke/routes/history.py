@@ -0,0 +1,141 @@
+"""Play history routes for browsing and editing past plays."""
+
+import sqlite3
+
+import flask_babel
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from pikaraoke.lib.current_app import get_karaoke_instance, get_site_name, is_admin
+
+_ = flask_babel.gettext
+
+
+history_bp = Blueprint("history", __name__)
+
+RESULTS_PER_PAGE = 20
+
+
+@history_bp.route("/history")
+def history():
+    """Play history page with top songs, top users, and recent plays.
+    ---
+    tags:
+      - Pages
+    parameters:
+      - name: user
+        in: query
+        type: string
+        description: Filter plays by username
+      - name: date
+        in: query
+        type: string
+        description: Filter plays by date (YYYY-MM-DD)
+      - name: after
+        in: query
+        type: string
+        description: Keyset cursor; show plays older than this timestamp
+      - name: after_id
+        in: query
+        type: integer
+        description: Row id tiebreaker for plays at exactly the cursor timestamp
+      - name: page
+        in: query
+        type: integer
+        description: Page number for recent plays (legacy deep links)
+    responses:
+      200:
+        description: HTML play history page
+    """
+    k = get_karaoke_instance()
+    db = k.play_db
+    user = request.args.get("user") or None
+    date_filter = request.args.get("date") or None
+    after = request.args.get("after") or None
+    after_id = request.args.get("after_id", type=int)
+    page = request.args.get("page", 1, type=int)
+    admin = is_admin()
+
+    bundle = db.get_history_page_bundle(
+        RESULTS_PER_PAGE,
+        offset=(page - 1) * RESULTS_PER_PAGE,
+        user=user,
+        date_filter=date_filter,
+        after_ts=after,
+        after_id=after_id,
+        include_songs=admin,
+    )
+
+    return render_template(
+        "history.html",
+        site_title=get_site_name(),
+        # MSG: Title of the play history page.
+        title=_("History"),
+        admin=admin,
+        user_filter=user,
+        date_filter=date_filter,
+        after=after,
+        page=page,
+        **bundle,
+    )
+
+
+@history_bp.route("/history/update", methods=["POST"])
+def update_play():
+    """Edit the user or song of a recorded play (admin only).
+    ---
+    tags:
+      - History
+    responses:
+      302:
+        description: Redirects to the history page
+    """
+    k = get_karaoke_instance()
+    if not is_admin():
+        # MSG: Message shown after a non-admin tries to edit play history.
+        flash(_("You don't have permission to edit the history"), "is-danger")
+        return redirect(url_for("history.history"))
+    play_id = request.form.get("play_id", type=int)
+    user = request.form.get("user") or None
+    song = request.form.get("song") or None
+    if play_id is None:
+        # MSG: Message shown after trying to edit the play history without specifying a play.
+        flash(_("Error: No play specified!"), "is-danger")
+    else:
+        try:
+            k.play_db.update_play(play_id, user=user, song=song)
+            # MSG: Message shown after a play history entry is updated.
+            flash(_("Play updated"), "is-success")
+        except sqlite3.IntegrityError:
+            # MSG: Message shown when a play history edit would duplicate another entry.
+            flash(_("Error: This edit would duplicate another play"), "is-danger")
+    return redirect(url_for("history.history"))
+
+
+@history_bp.route("/history/alias", methods=["POST"])
+def set_alias():
+    """Map or unmap a username alias to a canonical name (admin only).
+    ---
+    tags:
+      - History
+    responses:
+      302:
+        description: Redirects to the history page
+    """
+    k = get_karaoke_instance()
+    if not is_admin():
+        flash(_("You don't have permission to edit the history"), "is-danger")
+        return redirect(url_for("history.history"))
+    alias = request.form.get("alias") or None
+    canonical_name = request.form.get("canonical_name") or None
+    if alias is None:
+        # MSG: Message shown after trying to save a username alias without specifying it.
+        flash(_("Error: No alias specified!"), "is-danger")
+    elif canonical_name is None:
+        k.play_db.remove_user_alias(alias)
+        # MSG: Message shown after a username alias is removed.
+        flash(_("Alias removed: %s") % alias, "is-warning")
+    else:
+        k.play_db.set_user_alias(alias, canonical_name)
+        # MSG: Message shown after a username alias is created.
+        flash(_("Alias added: %s") % alias, "is-success")
+    return redirect(url_for("history.history"))
@@ -0,0 +1,328 @@
+"""Unit tests for PlayDatabase."""
+
+import sqlite3
+import threading
+
+import pytest
+
+from pikaraoke.lib.play_database import PlayDatabase
+
+
+def as_tuples(rows):
+    """Convert sqlite3.Row results to plain tuples for comparison."""
+    return [tuple(row) for row in rows]
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Create a PlayDatabase backed by a temp file."""
+    return PlayDatabase(str(tmp_path / "play_history.db"))
+
+
+class TestAddPlay:
+    """Tests for recording and retrieving plays."""
+
+    def test_add_play_is_retrievable(self, db):
+        """Test that a recorded play shows up in recent plays."""
+        db.add_play("Alice", "Song A")
+        plays = list(db.get_last_plays())
+        assert len(plays) == 1
+        assert plays[0]["canonical_name"] == "Alice"
+        assert plays[0]["song"] == "Song A"
+
+    def test_incomplete_play_flagged(self, db):
+        """Test that abnormal playback is recorded as not completed."""
+        db.add_play("Alice", "Song A", completed=False)
+        assert list(db.get_last_plays())[0]["completed"] == 0
+
+    def test_plays_count(self, db):
+        """Test counting plays with and without filters."""
+        db.add_play("Alice", "Song A")
+        db.add_play("Bob", "Song B")
+        assert db.get_plays_count() == 2
+        assert db.get_plays_count(user="Alice") == 1
+
+    def test_plays_count_seeded_for_legacy_database(self, db, tmp_path):
+        """Test that the total counter is backfilled from existing plays."""
+        db.add_play("Alice", "Song A")
+        db._conn().execute("DELETE FROM counters")
+        db.init_db()
+        assert db.get_plays_count() == 1
+
+    def test_date_filter(self, db, tmp_path):
+        """Test that the date filter matches only that day's plays."""
+        log = tmp_path / "history.log"
+        log.write_text(
+            "2024-01-01 20:00:00\tAlice\tSong A\n"
+            "2024-01-01 23:59:59\tAlice\tSong B\n"
+            "2024-01-02 00:00:00\tBob\tSong C\n",
+            encoding="utf-8",
+        )
+        db.populate_from_log(str(log))
+        assert db.get_plays_count(date_filter="2024-01-01") == 2
+        assert len(list(db.get_last_plays(date_filter="2024-01-02"))) == 1
+
+    def test_keyset_pagination(self, db, tmp_path):
+        """Test that the after_ts cursor returns the next older page."""
+        log = tmp_path / "history.log"
+        log.write_text(
+            "2024-01-01 20:00:00\tAlice\tSong A\n"
+            "2024-01-01 21:00:00\tAlice\tSong B\n"
+            "2024-01-01 22:00:00\tAlice\tSong C\n",
+            encoding="utf-8",
+        )
+        db.populate_from_log(str(log))
+        first_page = list(db.get_last_plays(2))
+        assert [play["song"] for play in first_page] == ["Song C", "Song B"]
+        second_page = list(db.get_last_plays(2, after_ts=first_page[-1]["timestamp"]))
+        assert [play["song"] for play in second_page] == ["Song A"]
+
+    def test_keyset_pagination_with_tied_timestamps(self, db, tmp_path):
+        """Test that plays sharing a timestamp are not skipped between pages."""
+        log = tmp_path / "history.log"
+        log.write_text(
+            "2024-01-01 20:00:00\tAlice\tSong A\n"
+            "2024-01-01 21:00:00\tAlice\tSong B\n"
+            "2024-01-01 21:00:00\tBob\tSong C\n",
+            encoding="utf-8",
+        )
+        db.populate_from_log(str(log))
+        first_page = list(db.get_last_plays(2))
+        cursor = first_page[-1]
+        second_page = list(
+            db.get_last_plays(2, after_ts=cursor["timestamp"], after_id=cursor["id"])
+        )
+        songs = [play["song"] for play in first_page + second_page]
+        assert sorted(songs) == ["Song A", "Song B", "Song C"]
+
+    def test_update_play(self, db):
+        """Test editing the user and song of a play."""
+        db.add_play("Alice", "Song A")
+        play_id = list(db.get_last_plays())[0]["id"]
+        db.update_play(play_id, user="Bob", song="Song B")
+        play = list(db.get_last_plays())[0]
+        assert play["canonical_name"] == "Bob"
+        assert play["song"] == "Song B"
+
+    def test_failed_write_rolls_back(self, db, tmp_path):
+        """Test that a failed write leaves the connection usable."""
+        log = tmp_path / "history.log"
+        log.write_text(
+            "2024-01-01 20:00:00\tAlice\tSong A\n2024-01-01 20:00:00\tAlice\tSong B\n",
+            encoding="utf-8",
+        )
+        db.populate_from_log(str(log))
+        play = next(p for p in db.get_last_plays() if p["song"] == "Song B")
+        with pytest.raises(sqlite3.IntegrityError):
+            db.update_play(play["id"], song="Song A")
+        db.add_play("Alice", "Song C")
+        assert db.get_plays_count() == 3
+
+
+class TestAggregates:
+    """Tests for top songs/users aggregates."""
+
+    def test_top_songs_ordering(self, db):
+        """Test that top songs are ordered by play count."""
+        db.add_play("Alice", "Song A")
+        db.add_play("Bob", "Song A")
+        db.add_play("Alice", "Song B")
+        assert as_tuples(db.get_top_songs()) == [("Song A", 2), ("Song B", 1)]
+
+    def test_top_songs_excludes_incomplete(self, db):
+        """Test that abnormal plays don't count toward top songs."""
+        db.add_play("Alice", "Song A", completed=False)
+        assert as_tuples(db.get_top_songs()) == []
+
+    def test_top_users(self, db):
+        """Test that top users are ordered by play count."""
+        db.add_play("Alice", "Song A")
+        db.add_play("Alice", "Song B")
+        db.add_play("Bob", "Song A")
+        assert as_tuples(db.get_top_users()) == [("Alice", 2), ("Bob", 1)]
+        assert db.get_top_users_count() == 2
+
+    def test_top_songs_by_period(self, db):
+        """Test that current-period top songs include today's plays."""
+        db.add_play("Alice", "Song A")
+        assert as_tuples(db.get_top_songs_by_period("day")) == [("Song A", 1)]
+        assert as_tuples(db.get_top_songs_by_period("month")) == [("Song A", 1)]
+        assert as_tuples(db.get_top_songs_by_period("year")) == [("Song A", 1)]
+
+    def test_top_songs_by_period_invalid(self, db):
+        """Test that an unknown period raises."""
+        with pytest.raises(ValueError):
+            db.get_top_songs_by_period("week")
+
+    def test_update_play_adjusts_aggregates(self, db):
+        """Test that editing a play moves its counts to the new song/user."""
+        db.add_play("Alice", "Song A")
+        play_id = list(db.get_last_plays())[0]["id"]
+        db.update_play(play_id, user="Bob", song="Song B")
+        assert as_tuples(db.get_top_songs()) == [("Song B", 1)]
+        assert as_tuples(db.get_top_users()) == [("Bob", 1)]
+
+    def test_summaries_rebuilt_for_legacy_database(self, db):
+        """Test that empty summary tables are backfilled from plays."""
+        db.add_play("Alice", "Song A")
+        for table in ("song_counts", "user_counts", "period_song_counts"):
+            db._conn().execute(f"DELETE FROM {table}")
+        db.init_db()
+        assert as_tuples(db.get_top_songs()) == [("Song A", 1)]
+        assert as_tuples(db.get_top_users()) == [("Alice", 1)]
+
+    def test_distinct_users_and_songs(self, db):
+        """Test distinct user, song, and date lists."""
+        db.add_play("Bob", "Song B")
+        db.add_play("Alice", "Song A")
+        assert db.get_distinct_users() == ["Alice", "Bob"]
+        assert db.get_distinct_songs() == ["Song A", "Song B"]
+        assert len(db.get_distinct_dates()) == 1
+
+    def test_distinct_lists_refresh_after_write(self, db):
+        """Test that cached distinct lists pick up new plays."""
+        db.add_play("Alice", "Song A")
+        assert db.get_distinct_users() == ["Alice"]
+        db.add_play("Bob", "Song B")
+        assert db.get_distinct_users() == ["Alice", "Bob"]
+
+
+class TestHistoryPageBundle:
+    """Tests for the bundled /history page query."""
+
+    def test_bundle_contents(self, db):
+        """Test that the bundle returns all page sections."""
+        db.add_play("Alice", "Song A")
+        db.add_play("Bob", "Song A")
+        bundle = db.get_history_page_bundle(10)
+        assert len(bundle["plays"]) == 2
+        assert bundle["has_more"] is False
+        assert bundle["total_count"] == 2
+        assert as_tuples(bundle["top_songs"]) == [("Song A", 2)]
+        assert bundle["distinct_users"] == ["Alice", "Bob"]
+        assert bundle["distinct_songs"] == []
+
+    def test_bundle_has_more(self, db):
+        """Test that has_more reflects rows beyond the page limit."""
+        db.add_play("Alice", "Song A")
+        db.add_play("Alice", "Song B")
+        bundle = db.get_history_page_bundle(1)
+        assert len(bundle["plays"]) == 1
+        assert bundle["has_more"] is True
+
+
+class TestAliases:
+    """Tests for username alias resolution."""
+
+    def test_alias_resolves_on_add(self, db):
+        """Test that plays by an alias are recorded under the canonical name."""
+        db.set_user_alias("Al", "Alice")
+        db.add_play("Al", "Song A")
+        assert list(db.get_last_plays())[0]["canonical_name"] == "Alice"
+
+    def test_alias_filter(self, db):
+        """Test that filtering by an alias finds the canonical user's plays."""
+        db.set_user_alias("Al", "Alice")
+        db.add_play("Alice", "Song A")
+        assert len(list(db.get_plays_by_user("Al"))) == 1
+
+    def test_alias_matching_ignores_case_and_whitespace(self, db):
+        """Test that case/whitespace variants resolve to one canonical name."""
+        db.set_user_alias("Al", "Alice")
+        db.add_play(" al ", "Song A")
+        assert list(db.get_last_plays())[0]["canonical_name"] == "Alice"
+
+    def test_unknown_user_variants_share_history(self, db):
+        """Test that the same name typed differently maps to one user."""
+        db.add_play("Bob", "Song A")
+        db.add_play("bob ", "Song B")
+        assert db.get_distinct_users() == ["Bob"]
+
+    def test_alias_cache_survives_reopen(self, db, tmp_path):
+        """Test that aliases persist and are reloaded by a new instance."""
+        db.set_user_alias("Al", "Alice")
+        reopened = PlayDatabase(str(tmp_path / "play_history.db"))
+        reopened.add_play("Al", "Song A")
+        assert list(reopened.get_last_plays())[0]["canonical_name"] == "Alice"
+
+    def test_user_variant_matching_survives_reopen(self, db, tmp_path):
+        """Test that variants of a known user still match after a restart."""
+        db.add_play("Bob", "Song A")
+        reopened = PlayDatabase(str(tmp_path / "play_history.db"))
+        reopened.add_play("bob ", "Song B")
+        assert reopened.get_distinct_users() == ["Bob"]
+
+    def test_bulk_aliases(self, db):
+        """Test that several aliases can be mapped in one call."""
+        db.set_user_aliases([("Al", "Alice"), ("Bobby", "Bob")])
+        db.add_play("Al", "Song A")
+        db.add_play("Bobby", "Song B")
+        assert db.get_distinct_users() == ["Alice", "Bob"]
+
+    def test_remove_alias(self, db):
+        """Test that a removed alias no longer resolves."""
+        db.set_user_alias("Al", "Alice")
+        db.remove_user_alias("Al")
+        db.add_play("Al", "Song A")
+        assert list(db.get_last_plays())[0]["canonical_name"] == "Al"
+
+
+class TestPopulateFromLog:
+    """Tests for backfilling plays from a log file."""
+
+    def test_import_and_dedup(self, db, tmp_path):
+        """Test that imports work and re-imports don't duplicate."""
+        log = tmp_path / "history.log"
+        log.write_text(
+            "2024-01-01 20:00:00\tAlice\tSong A\n" "2024-01-01 20:05:00\tBob\tSong B\n",
+            encoding="utf-8",
+        )
+        assert db.populate_from_log(str(log)) == 2
+        assert db.populate_from_log(str(log)) == 0
+        assert db.get_plays_count() == 2
+
+    def test_import_resolves_aliases_and_variants(self, db, tmp_path):
+        """Test that imported usernames go through alias/variant resolution."""
+        db.set_user_alias("Al", "Alice")
+        log = tmp_path / "history.log"
+        log.write_text(
+            "2024-01-01 20:00:00\tAl\tSong A\n"
+            "2024-01-01 20:05:00\tBob\tSong B\n"
+            "2024-01-01 20:10:00\tbob \tSong C\n",
+            encoding="utf-8",
+        )
+        db.populate_from_log(str(log))
+        assert db.get_distinct_users() == ["Alice", "Bob"]
+        assert len(list(db.get_plays_by_user("Bob"))) == 2
+
+    def test_malformed_lines_skipped(self, db, tmp_path, caplog):
+        """Test that malformed lines are skipped with a warning."""
+        log = tmp_path / "history.log"
+        log.write_text("not a valid line\n", encoding="utf-8")
+        assert db.populate_from_log(str(log)) == 0
+        assert "malformed" in caplog.text.lower()
+
+
+class TestThreading:
+    """Tests for the per-thread persistent connection."""
+
+    def test_connection_reused_within_thread(self, db):
+        """Test that the same connection object is handed out per thread."""
+        assert db._conn() is db._conn()
+
+    def test_other_threads_get_own_connection(self, db):
+        """Test that a different thread gets a different connection."""
+        conns = []
+        t = threading.Thread(target=lambda: conns.append(db._conn()))
+        t.start()
+        t.join()
+        assert conns[0] is not db._conn()
+
+    def test_writes_visible_across_threads(self, db):
+        """Test that a write from one thread is readable from another."""
+        db.add_play("Alice", "Song A")
+        results = []
+        t = threading.Thread(target=lambda: results.append(db.get_plays_count()))
+        t.start()
+        t.join()
+        assert results == [1]